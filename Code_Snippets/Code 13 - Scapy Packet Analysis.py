@@ -1,34 +1,139 @@
+import sys
+import time
+
 from scapy.all import *
 from scapy.layers.inet import IP
 
-# Sniff and save packets to a .pcap file
-captured_packets = sniff(count=100)
-wrpcap("captured_packets.pcap", captured_packets)
-
-# Load packets from a .pcap file
-loaded_packets = rdpcap("captured_packets.pcap")
-
-# Count the amount of packets received per source IP address
-ip_counts = {}
-for pkt in loaded_packets:
-    if IP in pkt:
-        src_ip = pkt[IP].src
-        if src_ip in ip_counts:
-            ip_counts[src_ip] += 1
-        else:
-            ip_counts[src_ip] = 1
-
-print(ip_counts)
-
-# Find the source IP address the least packets were received from (still at least one)
-ip_counts_list = list(ip_counts.items())
-ip_counts_list.sort(key=lambda x: x[1])
-
-# Filter the packets based on the least occurring source IP address
-filtered_packets = [pkt for pkt in loaded_packets if IP in pkt and pkt[IP].src == ip_counts_list[0][0]]
-
-# Print the payloads of the filtered packets
-for pkt in filtered_packets:
-    if Raw in pkt:
-        payload = pkt[Raw].load
-        print ('Payload:', payload)
+
+def analyze_pcap(filename, max_payloads=16, max_candidate_bytes=16 * 1024 * 1024):
+    '''
+    Analyze a .pcap file in a single streaming pass, so the capture never has to fit into memory
+    If the payloads of the least occurring source IP address could not be kept during the pass,
+    they are read in a second lazy pass
+    :param filename: the path of the .pcap file
+    :param max_payloads: the maximum amount of payloads kept per source IP address during the pass
+    :param max_candidate_bytes: the maximum amount of payload bytes kept for all source IP addresses together
+    :return: a dictionary with the packets and bytes per source IP address, the least occurring source IP address,
+                its payloads and the throughput of the analysis
+    '''
+
+    start = time.perf_counter()
+    total_packets = 0
+    ip_counts = {}
+    ip_bytes = {}
+    # Payloads per source IP address, None once a source sent more than max_payloads packets
+    candidate_payloads = {}
+    candidate_bytes = 0
+    # Set once the payloads of all sources together exceeded max_candidate_bytes, no payloads are kept afterwards
+    candidates_dropped = False
+
+    # Count the amount of packets and bytes received per source IP address
+    with PcapReader(filename) as reader:
+        for pkt in reader:
+            total_packets += 1
+            if IP not in pkt:
+                continue
+            src_ip = pkt[IP].src
+            count = ip_counts.get(src_ip, 0) + 1
+            ip_counts[src_ip] = count
+            ip_bytes[src_ip] = ip_bytes.get(src_ip, 0) + len(pkt)
+
+            if candidates_dropped:
+                continue
+            payloads = candidate_payloads.setdefault(src_ip, [])
+            if payloads is None:
+                continue
+            if count > max_payloads:
+                candidate_bytes -= sum(len(payload) for payload in payloads)
+                candidate_payloads[src_ip] = None
+            elif Raw in pkt:
+                payload = pkt[Raw].load
+                payloads.append(payload)
+                candidate_bytes += len(payload)
+                if candidate_bytes > max_candidate_bytes:
+                    candidate_payloads = {}
+                    candidates_dropped = True
+
+    # Find the source IP address the least packets were received from (still at least one)
+    least_ip = min(ip_counts, key=ip_counts.get) if ip_counts else None
+    payloads = candidate_payloads.get(least_ip, [])
+
+    # The payloads of the least occurring source were not kept (it sent more than max_payloads packets,
+    # or the candidates were dropped), read them lazily
+    if payloads is None or (candidates_dropped and least_ip is not None):
+        payloads = list(iter_payloads(filename, least_ip))
+
+    elapsed = time.perf_counter() - start
+    return {
+        'packets': total_packets,
+        'ip_counts': ip_counts,
+        'ip_bytes': ip_bytes,
+        'least_ip': least_ip,
+        'payloads': payloads,
+        'seconds': elapsed,
+        'packets_per_second': total_packets / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def iter_payloads(filename, src_ip):
+    '''
+    Stream the payloads of all packets of a .pcap file sent from the given source IP address
+    :param filename: the path of the .pcap file
+    :param src_ip: the source IP address
+    :return: a generator of the payloads
+    '''
+
+    with PcapReader(filename) as reader:
+        for pkt in reader:
+            if IP in pkt and pkt[IP].src == src_ip and Raw in pkt:
+                yield pkt[Raw].load
+
+
+def generate_pcap(filename, packets=10000, sources=50):
+    '''
+    Write a .pcap file with generated packets, to test the analysis offline without sniffing
+    Source i sends about i + 1 times as many packets as source 0, so the least occurring source is 10.0.0.0
+    :param filename: the path of the .pcap file
+    :param packets: the amount of packets to be generated
+    :param sources: the amount of source IP addresses
+    :return: None
+    '''
+
+    weights = [i + 1 for i in range(sources)]
+    total_weight = sum(weights)
+    with PcapWriter(filename) as writer:
+        for i in range(packets):
+            # Distribute the packets across the sources proportionally to their weight
+            position = (i * total_weight // packets) + 1
+            source = 0
+            while position > weights[source]:
+                position -= weights[source]
+                source += 1
+            writer.write(IP(src=f"10.0.{source // 256}.{source % 256}", dst="10.1.0.1") / Raw(load=f"packet {i}"))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--synthetic':
+        # Analyze a generated capture, no privileges for sniffing are needed
+        filename = "synthetic_packets.pcap"
+        generate_pcap(filename)
+    elif len(sys.argv) > 1:
+        # Analyze an existing capture, e.g., python "Code 13 - Scapy Packet Analysis.py" capture.pcap
+        filename = sys.argv[1]
+    else:
+        # Sniff and save packets to a .pcap file
+        captured_packets = sniff(count=100)
+        wrpcap("captured_packets.pcap", captured_packets)
+        filename = "captured_packets.pcap"
+
+    result = analyze_pcap(filename)
+
+    print(result['ip_counts'])
+    print(result['ip_bytes'])
+
+    # Print the payloads of the packets from the least occurring source IP address
+    for payload in result['payloads']:
+        print('Payload:', payload)
+
+    print(f"Analyzed {result['packets']} packets in {result['seconds']:.2f}s "
+          f"({result['packets_per_second']:.0f} packets/sec)")
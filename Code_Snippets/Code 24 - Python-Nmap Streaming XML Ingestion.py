@@ -0,0 +1,209 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from sqlalchemy import create_engine, Column, Integer, String, func, select
+from sqlalchemy.orm import declarative_base
+
+# Save the output of a scan as XML first, e.g.:
+#   nmap -sA --top-ports 100 -oX scan.xml 10.0.0.0/16
+# or with python-nmap: open('scan.xml', 'w').write(scanner.get_nmap_last_output())
+
+Base = declarative_base()
+
+
+class NmapHosts(Base):
+    '''
+    Class used for the representation of the scanned hosts when inserting them into the database
+    '''
+    __tablename__ = 'nmap_hosts'
+    id = Column(Integer, primary_key=True)
+    Address = Column(String)
+    Hostname = Column(String)
+    State = Column(String)
+
+
+class NmapPorts(Base):
+    '''
+    Class used for the representation of the scanned ports of a host when inserting them into the database
+    '''
+    __tablename__ = 'nmap_ports'
+    id = Column(Integer, primary_key=True)
+    Host_Id = Column(Integer, index=True)
+    Protocol = Column(String)
+    Port = Column(Integer)
+    State = Column(String)
+    Service = Column(String)
+
+
+def iter_hosts(filename):
+    '''
+    Stream-parse a nmap XML file host by host, without building the result dictionary of python-nmap
+    Every host element is removed from the tree once it was read, so the memory usage does not grow with the scan size
+    :param filename: the path of the XML file
+    :return: a generator of (host, ports) tuples, host is a dictionary and ports is a list of dictionaries
+    '''
+
+    root = None
+    for event, element in ET.iterparse(filename, events=('start', 'end')):
+        if root is None:
+            root = element
+        if event != 'end' or element.tag != 'host':
+            continue
+
+        address = None
+        for address_element in element.iter('address'):
+            # Prefer the IP address over the MAC address
+            if address is None or address_element.get('addrtype') in ('ipv4', 'ipv6'):
+                address = address_element.get('addr')
+        hostname_element = element.find('hostnames/hostname')
+        status_element = element.find('status')
+        host = {
+            'Address': address,
+            'Hostname': hostname_element.get('name') if hostname_element is not None else None,
+            'State': status_element.get('state') if status_element is not None else None,
+        }
+
+        ports = []
+        for port_element in element.iterfind('ports/port'):
+            state_element = port_element.find('state')
+            service_element = port_element.find('service')
+            ports.append({
+                'Protocol': port_element.get('protocol'),
+                'Port': int(port_element.get('portid')),
+                'State': state_element.get('state') if state_element is not None else None,
+                'Service': service_element.get('name') if service_element is not None else None,
+            })
+
+        yield host, ports
+
+        # Drop the processed host (and everything read before it) from the tree
+        root.clear()
+
+
+def ingest_nmap_xml(filename, engine, batch_size=5000):
+    '''
+    Insert the hosts and port states of a nmap XML file into the database, using bulk inserts of batch_size rows
+    :param filename: the path of the XML file
+    :param engine: the engine of the database
+    :param batch_size: the amount of rows collected before they are inserted (hosts and ports are counted separately)
+    :return: the amount of inserted hosts and ports as a tuple
+    '''
+
+    Base.metadata.create_all(engine)
+
+    host_count = 0
+    port_count = 0
+    with engine.begin() as connection:
+        # The ids of the hosts are assigned here, so the ports can reference them without reading them back
+        next_id = (connection.execute(select(func.max(NmapHosts.id))).scalar() or 0) + 1
+
+        host_rows = []
+        port_rows = []
+        for host, ports in iter_hosts(filename):
+            host['id'] = next_id
+            host_rows.append(host)
+            for port in ports:
+                port['Host_Id'] = next_id
+                port_rows.append(port)
+            next_id += 1
+
+            if len(host_rows) >= batch_size or len(port_rows) >= batch_size:
+                insert_rows(connection, host_rows, port_rows)
+                host_count += len(host_rows)
+                port_count += len(port_rows)
+                host_rows = []
+                port_rows = []
+
+        insert_rows(connection, host_rows, port_rows)
+        host_count += len(host_rows)
+        port_count += len(port_rows)
+
+    return host_count, port_count
+
+
+def insert_rows(connection, host_rows, port_rows):
+    '''
+    Insert a batch of hosts and ports with a single executemany statement per table
+    :param connection: the connection of the database
+    :param host_rows: the hosts as a list of dictionaries
+    :param port_rows: the ports as a list of dictionaries
+    :return: None
+    '''
+
+    if host_rows:
+        connection.execute(NmapHosts.__table__.insert(), host_rows)
+    if port_rows:
+        connection.execute(NmapPorts.__table__.insert(), port_rows)
+
+
+def write_synthetic_xml(filename, hosts, ports_per_host=100):
+    '''
+    Write a synthetic nmap XML file (e.g., of a /16 sweep), without keeping it in memory
+    :param filename: the path of the XML file
+    :param hosts: the amount of hosts
+    :param ports_per_host: the amount of ports per host
+    :return: None
+    '''
+
+    states = ['open', 'closed', 'filtered', 'unfiltered']
+    with open(filename, 'w') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n<nmaprun scanner="nmap" args="nmap -sA --top-ports 100">\n')
+        for i in range(hosts):
+            file.write(f'<host><status state="up" reason="echo-reply"/>'
+                       f'<address addr="10.0.{i // 256 % 256}.{i % 256}" addrtype="ipv4"/>'
+                       f'<hostnames><hostname name="host{i}.example" type="PTR"/></hostnames><ports>')
+            for port in range(1, ports_per_host + 1):
+                file.write(f'<port protocol="tcp" portid="{port}"><state state="{states[(i + port) % 4]}"/>'
+                           f'<service name="service{port}"/></port>')
+            file.write('</ports></host>\n')
+        file.write('</nmaprun>\n')
+
+
+def benchmark(host_counts=(1000, 10000), ports_per_host=100):
+    '''
+    Measure the throughput and the peak memory of the ingestion with synthetic XML files of different sizes
+    The throughput is measured without tracemalloc, the peak memory in a second, traced run
+    The peak memory should stay about the same for all sizes
+    :param host_counts: the amounts of hosts of the synthetic files
+    :param ports_per_host: the amount of ports per host
+    :return: None
+    '''
+
+    with tempfile.TemporaryDirectory() as directory:
+        for hosts in host_counts:
+            filename = os.path.join(directory, f'scan_{hosts}.xml')
+            write_synthetic_xml(filename, hosts, ports_per_host)
+            # Time an untraced run, tracemalloc would slow the ingestion down several times
+            engine = create_engine('sqlite://')
+            start = time.perf_counter()
+            host_count, port_count = ingest_nmap_xml(filename, engine)
+            elapsed = time.perf_counter() - start
+            engine.dispose()
+
+            # Measure the peak memory in a separate traced run on a fresh database
+            engine = create_engine('sqlite://')
+            tracemalloc.start()
+            ingest_nmap_xml(filename, engine)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            engine.dispose()
+
+            print(f"{host_count} hosts, {port_count} ports in {elapsed:.2f}s: "
+                  f"{host_count / elapsed:.0f} hosts/sec, {port_count / elapsed:.0f} ports/sec, "
+                  f"peak memory {peak / 2 ** 20:.1f} MiB")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark()
+    elif len(sys.argv) > 1:
+        # Ingest a saved scan into the database of the project
+        engine = create_engine('sqlite:///database.db')
+        host_count, port_count = ingest_nmap_xml(sys.argv[1], engine)
+        print(f"Inserted {host_count} hosts and {port_count} ports")
+    else:
+        print('Usage: python "Code 24 - Python-Nmap Streaming XML Ingestion.py" <scan.xml> | --benchmark')
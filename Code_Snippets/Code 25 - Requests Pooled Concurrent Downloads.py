@@ -0,0 +1,209 @@
+import functools
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes of responses worth retrying, all other client errors (e.g., 404) fail immediately
+RETRY_STATUS_CODES = {429}
+
+
+def create_session(pool_size=16, headers=None):
+    '''
+    Create a session shared by all downloads, its connection pool is large enough for one connection per worker
+    :param pool_size: the maximum amount of connections kept open per host
+    :param headers: headers sent with every request (e.g., {'Authorization': 'Bearer YOUR_ACCESS_TOKEN'})
+    :return: the session
+    '''
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def is_transient(error):
+    '''
+    Check whether a failed download is worth retrying
+    :param error: the exception raised by the download
+    :return: True for connection errors, timeouts, interrupted bodies, server errors and 429, otherwise False
+    '''
+
+    if isinstance(error, requests.exceptions.HTTPError):
+        status_code = error.response.status_code if error.response is not None else None
+        return status_code is not None and (status_code in RETRY_STATUS_CODES or status_code >= 500)
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+def remove_partial_file(filename):
+    '''
+    Remove the incomplete file of a failed download, if it exists
+    :param filename: the path of the incomplete file
+    :return: None
+    '''
+
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+def download(session, url, filename, retries=3, backoff=0.5, chunk_size=64 * 1024, timeout=30):
+    '''
+    Download a file in chunks, so the body never has to fit into memory
+    Transient failures (see is_transient) are retried with an exponential backoff, other failures (e.g., 404
+    or errors writing the file) are raised immediately. The file is only moved to filename once it is complete
+    :param session: the session used for the request
+    :param url: the url of the file
+    :param filename: the path the file will be saved in
+    :param retries: the amount of retries after a failed attempt
+    :param backoff: the waiting time before the first retry in seconds, doubled with every further retry
+    :param chunk_size: the amount of bytes written at once
+    :param timeout: the timeout of connecting and of waiting for data in seconds
+    :return: the amount of downloaded bytes
+    '''
+
+    partial_filename = filename + '.part'
+    for attempt in range(retries + 1):
+        try:
+            with session.get(url, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                size = 0
+                with open(partial_filename, 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        file.write(chunk)
+                        size += len(chunk)
+            os.replace(partial_filename, filename)
+            return size
+        except (requests.exceptions.RequestException, OSError) as e:
+            remove_partial_file(partial_filename)
+            if attempt == retries or not is_transient(e):
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def fetch_all(urls, directory, workers=16, retries=3, backoff=0.5, chunk_size=64 * 1024, headers=None):
+    '''
+    Download many files concurrently on a pool of threads sharing a single session
+    :param urls: the urls of the files
+    :param directory: the directory the files will be saved in
+    :param workers: the amount of threads (and of pooled connections per host)
+    :param retries: the amount of retries per file
+    :param backoff: the waiting time before the first retry in seconds
+    :param chunk_size: the amount of bytes written at once
+    :param headers: headers sent with every request
+    :return: a dictionary with the (url, amount of bytes or error) tuples of the downloads and the throughput
+    '''
+
+    os.makedirs(directory, exist_ok=True)
+    session = create_session(workers, headers)
+
+    def fetch(index, url):
+        # Prefix the index, so files with the same name from different urls do not overwrite each other
+        name = os.path.basename(urlparse(url).path) or 'index.html'
+        filename = os.path.join(directory, f'{index}_{name}')
+        try:
+            return url, download(session, url, filename, retries, backoff, chunk_size)
+        except (requests.exceptions.RequestException, OSError) as e:
+            # A failed download (including errors writing the file) does not abort the others
+            return url, e
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(fetch, range(len(urls)), urls))
+    finally:
+        session.close()
+    elapsed = time.perf_counter() - start
+
+    downloaded = [size for url, size in results if not isinstance(size, Exception)]
+    total_bytes = sum(downloaded)
+    return {
+        'results': results,
+        'succeeded': len(downloaded),
+        'failed': len(results) - len(downloaded),
+        'bytes': total_bytes,
+        'seconds': elapsed,
+        'requests_per_second': len(downloaded) / elapsed if elapsed > 0 else float('inf'),
+        'bytes_per_second': total_bytes / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+class QuietHTTPRequestHandler(SimpleHTTPRequestHandler):
+    '''
+    Request handler of the local server, which does not log every request to stderr
+    '''
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory):
+    '''
+    Serve a directory with a local http.server, used as a stand-in for a real server when testing
+    :param directory: the directory to be served
+    :return: the server (stop it with server.shutdown()) and its base url
+    '''
+
+    handler = functools.partial(QuietHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def benchmark(files=200, file_size=1024 * 1024, workers=16):
+    '''
+    Measure the throughput of fetch_all against a local http.server
+    :param files: the amount of files
+    :param file_size: the size of every file in bytes
+    :param workers: the amount of threads
+    :return: None
+    '''
+
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as target:
+        for i in range(files):
+            with open(os.path.join(source, f'file{i}.bin'), 'wb') as file:
+                file.write(os.urandom(file_size))
+
+        server, base_url = serve_directory(source)
+        try:
+            result = fetch_all([f'{base_url}/file{i}.bin' for i in range(files)], target, workers)
+        finally:
+            server.shutdown()
+
+    print_result(result)
+
+
+def print_result(result):
+    '''
+    Print the throughput and the failed urls of fetch_all
+    :param result: the result of fetch_all
+    :return: None
+    '''
+
+    for url, size in result['results']:
+        if isinstance(size, Exception):
+            print('Failed:', url, size)
+    print(f"{result['succeeded']} files ({result['bytes'] / 2 ** 20:.1f} MiB) in {result['seconds']:.2f}s: "
+          f"{result['requests_per_second']:.1f} requests/sec, {result['bytes_per_second'] / 2 ** 20:.1f} MiB/sec")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark()
+    elif len(sys.argv) > 1:
+        # Download the given urls, e.g., https://getsamplefiles.com/download/txt/sample-1.txt
+        print_result(fetch_all(sys.argv[1:], 'downloads'))
+    else:
+        print('Usage: python "Code 25 - Requests Pooled Concurrent Downloads.py" <url> [<url> ...] | --benchmark')
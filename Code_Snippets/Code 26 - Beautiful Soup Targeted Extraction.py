@@ -0,0 +1,203 @@
+import functools
+import glob
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
+
+# Compile the search pattern once instead of for every page
+WIKI_PATTERN = re.compile('Wikipedia')
+
+# Files larger than this are parsed incrementally with lxml instead of with BeautifulSoup
+INCREMENTAL_THRESHOLD = 8 * 1024 * 1024
+
+
+def extract_code17(html, pattern=WIKI_PATTERN):
+    '''
+    Search all strings of the full document for the pattern, as done in Code 17
+    Unlike the functions below, this also matches texts outside of the target tags (e.g., in <p> or comments)
+    :param html: the html document
+    :param pattern: the compiled search pattern
+    :return: a list of the matching strings
+    '''
+
+    soup = BeautifulSoup(html, 'lxml')
+    return [str(string) for string in soup.find_all(string=pattern)]
+
+
+def extract_full(html, tags=('a',), pattern=WIKI_PATTERN):
+    '''
+    Extract the texts of all target tags matching the pattern by parsing the full document
+    Returns the same results as extract_strained and extract_incremental, as a reference for the benchmark
+    :param html: the html document
+    :param tags: the names of the target tags
+    :param pattern: the compiled search pattern
+    :return: a list of the matching texts
+    '''
+
+    soup = BeautifulSoup(html, 'lxml')
+    texts = [element.get_text() for element in soup.find_all(tags)]
+    return [text for text in texts if pattern.search(text)]
+
+
+def extract_strained(html, tags=('a',), pattern=WIKI_PATTERN):
+    '''
+    Extract the texts of all target tags matching the pattern, only the target tags are added to the parse tree
+    :param html: the html document
+    :param tags: the names of the target tags
+    :param pattern: the compiled search pattern
+    :return: a list of the matching texts
+    '''
+
+    soup = BeautifulSoup(html, 'lxml', parse_only=SoupStrainer(list(tags)))
+    texts = [element.get_text() for element in soup.find_all(tags)]
+    return [text for text in texts if pattern.search(text)]
+
+
+def extract_incremental(filename, tags=('a',), pattern=WIKI_PATTERN):
+    '''
+    Extract the texts of all target tags matching the pattern from a (very large) html file
+    The file is parsed incrementally with lxml, every element outside of a target tag is removed once it was read,
+    so the whole document never has to fit into memory
+    :param filename: the path of the html file
+    :param tags: the names of the target tags
+    :param pattern: the compiled search pattern
+    :return: a list of the matching texts
+    '''
+
+    results = []
+    # Positions in results at which the currently open target tags start, their children are needed to read their text
+    # The text of a tag is inserted at its start position, so nested target tags are returned in document order
+    open_tags = []
+    for event, element in etree.iterparse(filename, events=('start', 'end'), html=True):
+        if event == 'start':
+            if element.tag in tags:
+                open_tags.append(len(results))
+            continue
+
+        if element.tag in tags:
+            position = open_tags.pop()
+            text = ''.join(element.itertext())
+            if pattern.search(text):
+                results.insert(position, text)
+
+        if not open_tags:
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    return results
+
+
+def extract_file(filename, tags=('a',), pattern=WIKI_PATTERN):
+    '''
+    Extract the texts of all target tags matching the pattern from a html file, large files are parsed incrementally
+    :param filename: the path of the html file
+    :param tags: the names of the target tags
+    :param pattern: the compiled search pattern
+    :return: a list of the matching texts
+    '''
+
+    if os.path.getsize(filename) > INCREMENTAL_THRESHOLD:
+        return extract_incremental(filename, tags, pattern)
+    with open(filename, 'rb') as file:
+        return extract_strained(file.read(), tags, pattern)
+
+
+def extract_directory(directory, tags=('a',), pattern=WIKI_PATTERN, workers=None):
+    '''
+    Extract the texts of all target tags matching the pattern from every html file of a directory, using a process pool
+    :param directory: the directory containing the html files
+    :param tags: the names of the target tags
+    :param pattern: the compiled search pattern
+    :param workers: the amount of processes, defaults to the amount of CPUs
+    :return: a dictionary mapping the path of every html file to its matching texts
+    '''
+
+    filenames = sorted(glob.glob(os.path.join(directory, '*.html')))
+    extract = functools.partial(extract_file, tags=tags, pattern=pattern)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(filenames, executor.map(extract, filenames, chunksize=4)))
+
+
+def write_fixtures(directory, pages=100, paragraphs=2000):
+    '''
+    Write html pages with many elements, of which only a few are links, as local fixtures for the benchmark
+    Some links are nested in sections, so the order of nested target tags is covered by the comparison
+    :param directory: the directory the pages will be saved in
+    :param pages: the amount of pages
+    :param paragraphs: the amount of paragraphs per page
+    :return: None
+    '''
+
+    for page in range(pages):
+        with open(os.path.join(directory, f'page{page}.html'), 'w') as file:
+            file.write('<html><head><title>Fixture</title></head><body>\n')
+            for i in range(paragraphs):
+                file.write(f'<div class="section"><p>Paragraph {i} of page {page} with some <b>bold</b> text</p>')
+                if i % 20 == 0:
+                    file.write(f'<a href="/wiki/{i}">Wikipedia article {i}</a><a href="/other/{i}">Other {i}</a>')
+                if i % 100 == 0:
+                    file.write(f'<section>Wikipedia section {i} <a href="/wiki/s{i}">Wikipedia link {i}</a></section>')
+                file.write('</div>\n')
+            file.write('</body></html>\n')
+
+
+def benchmark(pages=100, paragraphs=2000):
+    '''
+    Compare the parsing of the full tree with the strained and the incremental parsing on local html fixtures
+    The search over all strings of Code 17 is included as a baseline, its results are not compared
+    as it also matches texts outside of the target tags
+    :param pages: the amount of pages
+    :param paragraphs: the amount of paragraphs per page
+    :return: None
+    '''
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_fixtures(directory, pages, paragraphs)
+        filenames = sorted(glob.glob(os.path.join(directory, '*.html')))
+
+        def read(filename):
+            with open(filename, 'rb') as file:
+                return file.read()
+
+        start = time.perf_counter()
+        matches = sum(len(extract_code17(read(filename))) for filename in filenames)
+        elapsed = time.perf_counter() - start
+        print(f'Code 17 baseline: {len(filenames)} pages, {matches} matches in {elapsed:.2f}s '
+              f'({len(filenames) / elapsed:.1f} pages/sec)')
+
+        # Sections contain links, so the target tags are nested
+        tags = ('section', 'a')
+        runs = [
+            ('full tree', lambda: [extract_full(read(filename), tags) for filename in filenames]),
+            ('strained', lambda: [extract_strained(read(filename), tags) for filename in filenames]),
+            ('incremental', lambda: [extract_incremental(filename, tags) for filename in filenames]),
+            ('strained, process pool', lambda: list(extract_directory(directory, tags).values())),
+        ]
+        expected = None
+        for name, run in runs:
+            start = time.perf_counter()
+            results = run()
+            elapsed = time.perf_counter() - start
+            matches = sum(len(texts) for texts in results)
+            if expected is None:
+                expected = results
+            elif results != expected:
+                print(f'{name}: results differ from the full tree parsing')
+            print(f'{name}: {len(filenames)} pages, {matches} matches in {elapsed:.2f}s '
+                  f'({len(filenames) / elapsed:.1f} pages/sec)')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark()
+    elif len(sys.argv) > 1:
+        for filename, texts in extract_directory(sys.argv[1]).items():
+            print(filename, texts)
+    else:
+        print('Usage: python "Code 26 - Beautiful Soup Targeted Extraction.py" <directory> | --benchmark')
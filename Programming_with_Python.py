@@ -10,6 +10,8 @@ Date: 14.08.2024
 
 Order of execution / pipeline of the program:
     When started, the program first creates a connection to a database.
+    The storage backend of the data is selected through the variable storageBackend: a SQL database file,
+    an in-memory SQLite database, or pandas dataframes kept in the memory of the process.
     Then, the individual datasets are read and stored in the database, for which different classes are used.
     Afterwards, the program selects four ideal functions, maps the individual data points to these functions
     and inserts the results into a database.
@@ -26,12 +28,17 @@ Order of execution / pipeline of the program:
 
 Components:
  - Classes:
-    - Data: Class providing functions to store and retrieve data from a database
+    - StorageBackend: Interface of the storage backends used by Data
+    - SQLStorageBackend(StorageBackend): Storage backend using a SQL database
+    - InMemorySQLStorageBackend(SQLStorageBackend): Storage backend using an in-memory SQLite database
+    - DataFrameStorageBackend(StorageBackend): Storage backend using pandas dataframes
+    - Data: Class providing functions to store and retrieve data from a storage backend
     - TrainingData(Data): Child class of Data, used for training data
     - IdealFunctions(Data): Child class of Data, used for ideal data
     - TestData(Data): Child class of Data, used for test data
     - TestResults(Base): Class to save test results in a database
     - UnitTestTestResults(Base): Class to save test results of unit-tests in a database
+    - TestResultWriter(threading.Thread): Thread saving the test results in batches, used by the parallel assignment
     - AppendedTestDatabaseException(Exception): Custom exception, is raised in the unit-tests if the database contains
         to many values (e.g., if the data from a previous exectution of the program is still included
     - UnitTests(unittest.TestCase): Class containing the unit-tests
@@ -47,14 +54,20 @@ Components:
 
 
 
+import io
 import os
+import queue
+from abc import ABC, abstractmethod
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import bokeh
 import pandas as pd
 import numpy as np
 from sqlalchemy import create_engine, Column, Integer, Float
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
+from sqlalchemy.pool import StaticPool
 from bokeh.plotting import figure, show, output_file
 from bokeh.models import ColumnDataSource, Legend
 
@@ -64,58 +77,104 @@ import sqlalchemy as db
 # Set to True to only perform the unit tests
 onlyUnitTests = False
 
+# Set to True to assign the test data on a pool of threads, with a single thread writing the results
+parallelAssignment = False
+
+# The storage backend used for the data: 'sql' (database.db file), 'memory' (in-memory SQLite database)
+# or 'dataframe' (pandas dataframes), can be overwritten with the environment variable STORAGE_BACKEND
+storageBackend = os.environ.get('STORAGE_BACKEND', 'sql')
+
 
 # Define the base for SQLAlchemy ORM classes
 Base = declarative_base()
 
 
-class Data():
+class StorageBackend(ABC):
     '''
-    Main class responsible for the object oriented reading of data from a csv file,
-    as well as saving and accessing it from a SQL database
+    Interface of the storage backends used by the Data class to persist and access the data read from a csv file
+    Every backend additionally provides an engine, which is used for the ORM tables holding the test results
+    Backends have to implement all of the following functions, otherwise they can not be instantiated
 
     Functions:
-        - __init__(filepath, engine, table_name): read data from a csv file and save it in a SQL database
-        - getColumns(): get the data column wise
-        - getRows(): get the data row wise
-        - getDataframe(): get the data as a pandas dataframe
-        - get_x_row(): get a specific row from the database
+        - save(table_name, dataframe): store a pandas dataframe under the given table name
+        - get_columns(table_name): get the data of a table column wise
+        - get_rows(table_name): get the data of a table row wise
+        - get_dataframe(table_name): get the data of a table as a pandas dataframe
+        - get_x_row(table_name, x): get the row of a table with the given x value
     '''
 
-    # Example of handling exceptions for CSV loading and database operations
-    def __init__(self, filepath, engine, table_name):
+    engine = None
+
+    @abstractmethod
+    def save(self, table_name, dataframe):
         '''
-        Read data from a csv file and save it in a SQL database
-        :param filepath: the path of the csv file
-        :param engine: the engine of the database
-        :param table_name: the name of the table in the database the data will be saved in
+        Store a pandas dataframe, replacing any data previously stored under the same name
+        :param table_name: the name of the table the data will be saved in
+        :param dataframe: the data as a pandas dataframe
+        :return: None
         '''
+        raise NotImplementedError
 
-        try:
-            self.engine = engine
-            self.table_name = table_name
-            self.data = pd.read_csv(filepath)
+    @abstractmethod
+    def get_columns(self, table_name):
+        '''
+        Get the Columns of a table
+        :param table_name: the name of the table
+        :return: An array containing the data column wise
+        '''
+        raise NotImplementedError
 
-            self.data.to_sql(table_name, con=engine, index=False, if_exists='replace')
-        except FileNotFoundError:
-            print("File not found, please check the path and try again.")
-        except pd.errors.ParserError:
-            print("Error parsing the file, please check the file format.")
+    @abstractmethod
+    def get_rows(self, table_name):
+        '''
+        Get the Rows of a table
+        :param table_name: the name of the table
+        :return: An array containing the data row wise
+        '''
+        raise NotImplementedError
 
+    @abstractmethod
+    def get_dataframe(self, table_name):
+        '''
+        Get the data of a table as a pandas dataframe
+        :param table_name: the name of the table
+        :return: the data as a pandas dataframe
+        '''
+        raise NotImplementedError
 
-    def getColumns(self):
+    @abstractmethod
+    def get_x_row(self, table_name, x):
         '''
-        Get the Columns of the database
-        :return: An array containing the data column wise
+        Get a specific row of a table
+        :param table_name: the name of the table
+        :param x: the x value of the row to be selected
+        :return: the row with the given x value, its values are accessible as attributes (e.g., row.y1)
+        '''
+        raise NotImplementedError
+
+
+class SQLStorageBackend(StorageBackend):
+    '''
+    Storage backend saving the data in a SQL database using a SQLAlchemy engine
+    '''
+
+    def __init__(self, engine):
         '''
+        Initialize the backend
+        :param engine: the engine of the database
+        '''
+        self.engine = engine
 
-        # Select and print data
+    def save(self, table_name, dataframe):
+        dataframe.to_sql(table_name, con=self.engine, index=False, if_exists='replace')
+
+    def get_columns(self, table_name):
         meta_data = db.MetaData()
         connection = self.engine.connect()
 
         result = []
         try:
-            table = db.Table(self.table_name, meta_data, autoload_with=self.engine)
+            table = db.Table(table_name, meta_data, autoload_with=self.engine)
             result = connection.execute(db.select(table))
             result = [list(col) for col in zip(*result)]
         finally:
@@ -123,19 +182,13 @@ class Data():
 
         return result
 
-    def getRows(self):
-        '''
-        Get the Rows of the database
-        :return: An array containing the data row wise
-        '''
-
-        # Select and print data
+    def get_rows(self, table_name):
         meta_data = db.MetaData()
         connection = self.engine.connect()
 
         result = []
         try:
-            table = db.Table(self.table_name, meta_data, autoload_with=self.engine)
+            table = db.Table(table_name, meta_data, autoload_with=self.engine)
             result = connection.execute(db.select(table))
             result = [list(col) for col in result]
         finally:
@@ -143,36 +196,25 @@ class Data():
 
         return result
 
-    def get_dataframe(self):
-        '''
-        Get the data as a pandas dataframe
-        :return: the data as a pandas dataframe
-        '''
+    def get_dataframe(self, table_name):
         meta_data = db.MetaData()
-        table = db.Table(self.table_name, meta_data, autoload_with=engine)
+        table = db.Table(table_name, meta_data, autoload_with=self.engine)
 
         # Use a context manager to ensure that the connection is closed
-        with engine.connect() as connection:
+        with self.engine.connect() as connection:
             # Select everything from table and load directly into a DataFrame
             query = table.select()
             result = pd.read_sql(query, connection)
 
         return result
 
-    def get_x_row(self, x):
-        '''
-        Get a specific row of the database (table)
-        :param x: the index of the row to be selected
-        :return: the row at position x of the data
-        '''
-
-        # Select and print data
+    def get_x_row(self, table_name, x):
         meta_data = db.MetaData()
         connection = self.engine.connect()
 
         result = []
         try:
-            table = db.Table(self.table_name, meta_data, autoload_with=self.engine)
+            table = db.Table(table_name, meta_data, autoload_with=self.engine)
             query = db.select(table).where(table.c.x == x)
             result = connection.execute(query).fetchall()
             result = result[0]
@@ -182,6 +224,146 @@ class Data():
         return result
 
 
+class InMemorySQLStorageBackend(SQLStorageBackend):
+    '''
+    Storage backend saving the data in an in-memory SQLite database
+    No file is written, so several runs of the program do not interfere with each other
+    '''
+
+    def __init__(self):
+        '''
+        Initialize the backend with a new in-memory SQLite database
+        The StaticPool makes every connection of the engine use the same in-memory database
+        '''
+        super().__init__(create_in_memory_engine())
+
+
+class DataFrameStorageBackend(StorageBackend):
+    '''
+    Storage backend keeping the data as pandas dataframes in the memory of the process, without using SQL
+    The ORM tables of the test results are stored in an in-memory SQLite database
+    '''
+
+    def __init__(self):
+        '''
+        Initialize the backend without any tables
+        '''
+        self.tables = {}
+        self.engine = create_in_memory_engine()
+
+    def save(self, table_name, dataframe):
+        self.tables[table_name] = dataframe.reset_index(drop=True)
+
+    def get_columns(self, table_name):
+        dataframe = self.tables[table_name]
+        return [dataframe[column].tolist() for column in dataframe.columns]
+
+    def get_rows(self, table_name):
+        return [list(row) for row in self.tables[table_name].itertuples(index=False)]
+
+    def get_dataframe(self, table_name):
+        return self.tables[table_name].copy()
+
+    def get_x_row(self, table_name, x):
+        dataframe = self.tables[table_name]
+        rows = list(dataframe[dataframe['x'].to_numpy() == x].itertuples(index=False, name='Row'))
+        return rows[0]
+
+
+def create_in_memory_engine():
+    '''
+    Create the engine of a new in-memory SQLite database
+    :return: the engine of the database
+    '''
+    return create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+
+
+def create_storage_backend(name):
+    '''
+    Create the storage backend with the given name
+    :param name: the name of the backend, either 'sql' (database.db file), 'memory' (in-memory SQLite database)
+                    or 'dataframe' (pandas dataframes)
+    :return: the created storage backend
+    '''
+    if name == 'sql':
+        # Delete the database-file if exists, to make sure no redundancies from previous runs are included
+        if (os.path.isfile('database.db')):
+            os.remove('database.db')
+        return SQLStorageBackend(create_engine('sqlite:///database.db'))
+    if name == 'memory':
+        return InMemorySQLStorageBackend()
+    if name == 'dataframe':
+        return DataFrameStorageBackend()
+    raise ValueError(f"Unknown storage backend '{name}', expected 'sql', 'memory' or 'dataframe'")
+
+
+class Data():
+    '''
+    Main class responsible for the object oriented reading of data from a csv file,
+    as well as saving and accessing it through a storage backend (e.g., a SQL database)
+
+    Functions:
+        - __init__(filepath, storage, table_name): read data from a csv file and save it in the storage backend
+        - getColumns(): get the data column wise
+        - getRows(): get the data row wise
+        - getDataframe(): get the data as a pandas dataframe
+        - get_x_row(): get a specific row from the database
+    '''
+
+    # Example of handling exceptions for CSV loading and database operations
+    def __init__(self, filepath, storage, table_name):
+        '''
+        Read data from a csv file and save it in the storage backend
+        :param filepath: the path of the csv file
+        :param storage: the storage backend, or the engine of a SQL database
+        :param table_name: the name of the table in the database the data will be saved in
+        '''
+
+        try:
+            if not isinstance(storage, StorageBackend):
+                storage = SQLStorageBackend(storage)
+            self.storage = storage
+            self.engine = storage.engine
+            self.table_name = table_name
+            self.data = pd.read_csv(filepath)
+
+            self.storage.save(table_name, self.data)
+        except FileNotFoundError:
+            print("File not found, please check the path and try again.")
+        except pd.errors.ParserError:
+            print("Error parsing the file, please check the file format.")
+
+
+    def getColumns(self):
+        '''
+        Get the Columns of the database
+        :return: An array containing the data column wise
+        '''
+        return self.storage.get_columns(self.table_name)
+
+    def getRows(self):
+        '''
+        Get the Rows of the database
+        :return: An array containing the data row wise
+        '''
+        return self.storage.get_rows(self.table_name)
+
+    def get_dataframe(self):
+        '''
+        Get the data as a pandas dataframe
+        :return: the data as a pandas dataframe
+        '''
+        return self.storage.get_dataframe(self.table_name)
+
+    def get_x_row(self, x):
+        '''
+        Get a specific row of the database (table)
+        :param x: the index of the row to be selected
+        :return: the row at position x of the data
+        '''
+        return self.storage.get_x_row(self.table_name, x)
+
+
 # Define a class for training data in the database
 class TrainingData(Data):
     '''
@@ -236,13 +418,11 @@ class UnitTestTestResults(Base):
     No_of_ideal_func = Column(Integer)
 
 
-# Delete the database-file if exists, to make sure no redundancies from previous runs are included
-if (os.path.isfile('database.db')):
-    os.remove('database.db')
-
-# Establish connection to a SQLite database and create tables
+# Establish connection to the storage backend and create tables
+# An unknown backend name raises a ValueError, it is not caught so the program stops with a clear message
+storage = create_storage_backend(storageBackend)
+engine = storage.engine
 try:
-    engine = create_engine('sqlite:///database.db')
     Base.metadata.create_all(engine)
 except Exception as e:
     print(f"Error establishing database connection or creating tables: {e}")
@@ -251,6 +431,9 @@ except Exception as e:
 Session = sessionmaker(bind=engine)
 session = Session()
 
+# Thread-local sessions, used by the threads of the parallel assignment
+ScopedSession = scoped_session(Session)
+
 
 
 
@@ -300,6 +483,52 @@ def get_maximum_deviation(training_function, ideal_function):
     return max_deviation
 
 
+def get_function_deviations(training_data, ideal_data, best_functions):
+    '''
+    Get the maximum deviation of each selected best function to its assigned training function
+    :param training_data: the training functions
+    :param ideal_data: the ideal functions
+    :param best_functions: the found best functions (their ids)
+    :return: a dictionary mapping the id of each best function to its maximum deviation
+    '''
+
+    deviations = {}
+    training_columns = training_data.getColumns()[1:]
+    ideal_columns = ideal_data.getColumns()
+    for func_id in best_functions:
+        min_deviation = float('inf')
+        for column in training_columns:
+            dev = get_maximum_deviation(column, ideal_columns[func_id])
+            if dev < min_deviation:
+                min_deviation = dev
+        deviations[func_id] = min_deviation
+    return deviations
+
+
+def assign_test_point(x, y, ideal_x_row, best_functions, deviations):
+    '''
+    Assign a single test data point to one of the best functions if the criteria are matched
+    :param x: the x value of the test data point
+    :param y: the y value of the test data point
+    :param ideal_x_row: the row of the ideal functions with the same x value
+    :param best_functions: the found best functions (their ids)
+    :param deviations: the maximum deviations of the best functions (see get_function_deviations)
+    :return: the assignment as a dictionary, or None if the point could not be assigned
+    '''
+
+    best_match = None
+    min_deviation = float('inf')
+    for func_id in best_functions:
+        ideal_val = getattr(ideal_x_row, 'y'+ str(func_id))
+        dev = abs(y - ideal_val)
+        if dev < min_deviation:
+            best_match = func_id
+            min_deviation = dev
+    if best_match is not None and min_deviation <= deviations.get(best_match) * np.sqrt(2):
+        return {'X': x, 'Y': y, 'Delta_Y': min_deviation, 'Ideal_Function_No': best_match}
+    return None
+
+
 def assign_test_data (training_data, ideal_data, test_data, best_functions, session, unit_tests, save_mappings=True):
     '''
     Assign the test data points to one of the best functions if the criteria are matched
@@ -313,36 +542,188 @@ def assign_test_data (training_data, ideal_data, test_data, best_functions, sess
     :return: the results of the matching of values
     '''
 
-    deviations = {}
-    # Get the maximum deviation of each selected best function to its assigned function#
-    for func_id in best_functions:
-        min_deviation = float('inf')
-        for column in training_data.getColumns()[1:]:
-            dev = get_maximum_deviation(column, ideal_data.getColumns()[func_id])
-            if dev < min_deviation:
-                min_deviation = dev
-        deviations[func_id] = min_deviation
+    deviations = get_function_deviations(training_data, ideal_data, best_functions)
 
     results = []
     for row in test_data.getRows():
         x, y = row[0], row[1]
-        best_match = None
-        min_deviation = float('inf')
-        ideal_x_row = ideal_data.get_x_row(x)
-        for func_id in best_functions:
-            ideal_val = getattr(ideal_x_row, 'y'+ str(func_id))
-            dev = abs(y - ideal_val)
-            if dev < min_deviation:
-                best_match = func_id
-                min_deviation = dev
-        if best_match is not None and min_deviation <= deviations.get(best_match) * np.sqrt(2):
-            results.append({'X': x, 'Y': y, 'Delta_Y': min_deviation, 'Ideal_Function_No': best_match})
+        mapping = assign_test_point(x, y, ideal_data.get_x_row(x), best_functions, deviations)
+        if mapping is not None:
+            results.append(mapping)
 
     if (save_mappings):
         save_test_mappings(results, session, unit_tests)
 
     return results
 
+
+class TestResultWriter(threading.Thread):
+    '''
+    Thread being the single writer of test results into the database
+    The assignments are handed over through a bounded queue and inserted in batches,
+    so the computation of assignments and the database writes can overlap
+
+    Functions:
+        - __init__(session_registry, unit_tests, batch_size, queue_size): create the writer thread
+        - put(test_mappings): hand a list of assignments to the writer, blocks while the queue is full
+        - close(): write the remaining assignments and wait for the writer to finish
+    '''
+
+    def __init__(self, session_registry, unit_tests, batch_size=500, queue_size=16):
+        '''
+        Create the writer thread
+        :param session_registry: a scoped_session, the writer uses the session belonging to its own thread
+        :param unit_tests: whether or not the assignments are part of a unit test
+        :param batch_size: the amount of assignments inserted with a single commit
+        :param queue_size: the maximum amount of lists of assignments waiting in the queue
+        '''
+        super().__init__(daemon=True)
+        self.session_registry = session_registry
+        self.unit_tests = unit_tests
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+
+    def put(self, test_mappings):
+        '''
+        Hand a list of assignments to the writer
+        :param test_mappings: the assignments (see assign_test_point)
+        :return: None
+        '''
+        self.queue.put(test_mappings)
+
+    def close(self):
+        '''
+        Write the remaining assignments and wait for the writer to finish
+        Raises the error of the writer, if writing the assignments failed
+        :return: None
+        '''
+        self.queue.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        '''
+        Take the assignments from the queue and save them in batches
+        After an error, the queue is still drained, so the producers and close() are not blocked
+        :return: None
+        '''
+        finished = False
+        try:
+            session = self.session_registry()
+            try:
+                pending = []
+                while True:
+                    test_mappings = self.queue.get()
+                    if test_mappings is None:
+                        finished = True
+                        break
+                    if self.error is not None:
+                        continue
+                    pending.extend(test_mappings)
+                    if len(pending) >= self.batch_size:
+                        self.write(session, pending)
+                        pending = []
+                if pending and self.error is None:
+                    self.write(session, pending)
+            finally:
+                self.session_registry.remove()
+        except Exception as e:
+            # Any error of the writer is stored to be raised by close(), instead of ending the thread silently
+            if self.error is None:
+                self.error = e
+
+        while not finished:
+            finished = self.queue.get() is None
+
+    def write(self, session, test_mappings):
+        '''
+        Save a batch of assignments, errors are stored to be raised by close()
+        :param session: the session of the writer thread
+        :param test_mappings: the assignments to be saved
+        :return: None
+        '''
+        try:
+            save_test_mappings(test_mappings, session, self.unit_tests)
+        except Exception as e:
+            session.rollback()
+            self.error = e
+
+
+def assign_test_data_parallel(training_data, ideal_data, test_data, best_functions, session_registry, unit_tests,
+                              save_mappings=True, workers=4, batch_size=500, queue_size=16):
+    '''
+    Assign the test data points to one of the best functions if the criteria are matched, using a pool of threads
+    The test data points are split into one partition per worker. The workers only compute the assignments,
+    the saving in the database is done by a single TestResultWriter thread
+    :param training_data: the training functions
+    :param ideal_data: the ideal functions
+    :param test_data: the test data points
+    :param best_functions: the found best functions (their ids)
+    :param session_registry: a scoped_session used by the writer thread
+    :param unit_tests: a boolean value representing whether the functions was called as part of a unit test
+    :param save_mappings: a boolean value indicating whether the assignments produced in this function should be saved in the database
+    :param workers: the amount of worker threads
+    :param batch_size: the amount of assignments a worker hands to the writer at once and the writer commits at once
+    :param queue_size: the maximum amount of batches waiting for the writer
+    :return: the results of the matching of values, in the same order as assign_test_data
+    '''
+
+    deviations = get_function_deviations(training_data, ideal_data, best_functions)
+
+    # Read the ideal functions once, so the workers do not access the storage backend concurrently
+    ideal_rows = {row.x: row for row in ideal_data.get_dataframe().itertuples(index=False, name='Row')}
+
+    test_rows = test_data.getRows()
+    partition_size = max(1, -(-len(test_rows) // workers))
+    partitions = [test_rows[i:i + partition_size] for i in range(0, len(test_rows), partition_size)]
+
+    writer = None
+    if save_mappings:
+        writer = TestResultWriter(session_registry, unit_tests, batch_size, queue_size)
+        writer.start()
+
+    def assign_partition(partition):
+        results = []
+        batch = []
+        for row in partition:
+            x, y = row[0], row[1]
+            if x not in ideal_rows:
+                # Same error as get_x_row of the storage backends, so both modes fail the same way
+                raise IndexError(f"No row of the ideal functions with x = {x}")
+            mapping = assign_test_point(x, y, ideal_rows[x], best_functions, deviations)
+            if mapping is not None:
+                results.append(mapping)
+                batch.append(mapping)
+            if writer is not None and len(batch) >= batch_size:
+                writer.put(batch)
+                batch = []
+        if writer is not None and batch:
+            writer.put(batch)
+        return results
+
+    worker_error = None
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            partition_results = list(executor.map(assign_partition, partitions))
+    except Exception as e:
+        worker_error = e
+
+    # The writer is closed in any case, an error of a worker is raised first, with the error of the writer as context
+    if writer is not None:
+        try:
+            writer.close()
+        except Exception:
+            if worker_error is not None:
+                raise worker_error
+            raise
+    if worker_error is not None:
+        raise worker_error
+
+    return [mapping for results in partition_results for mapping in results]
+
+
 def save_test_mappings(test_mappings, session, unit_tests):
     '''
     Save the results of assign_test_data in a SQL database
@@ -420,12 +801,16 @@ if not onlyUnitTests:
     '''
     The function calls necessary to perform the tasks
     '''
-    training_data = TrainingData('Dataset2/train.csv', engine)
-    ideal_functions_data = IdealFunctions('Dataset2/ideal.csv', engine)
-    test_data = TestData('Dataset2/test.csv', engine)
+    training_data = TrainingData('Dataset2/train.csv', storage)
+    ideal_functions_data = IdealFunctions('Dataset2/ideal.csv', storage)
+    test_data = TestData('Dataset2/test.csv', storage)
     training_data.getColumns()
     best_functions = find_best_matching_functions(training_data, ideal_functions_data)
-    test_mappings = assign_test_data(training_data, ideal_functions_data, test_data, best_functions, session, False)
+    if parallelAssignment:
+        test_mappings = assign_test_data_parallel(training_data, ideal_functions_data, test_data, best_functions,
+                                                  ScopedSession, False)
+    else:
+        test_mappings = assign_test_data(training_data, ideal_functions_data, test_data, best_functions, session, False)
     visualize_data(training_data, "Visualization", ideal_functions_data, test_data, best_functions, test_mappings)
 
 
@@ -463,8 +848,11 @@ class UnitTests(unittest.TestCase):
 
     Unit Tests:
         - test_save_data(): Tests whether the reading of data from a csv file, as well as saving and reading it into a SQL Database is working properly
+        - test_storage_backends(): Tests whether every storage backend saves and returns the data in the same way
         - test_find_best_matching_function(): Tests whether the finding of the best matching functions is working properly
         - test_assign_test_data(): Tests whether the matching of specific data points to the best found functions is working properly
+        - test_assign_test_data_parallel(): Tests whether the parallel matching and saving of data points is working properly
+        - test_assign_test_data_parallel_missing_x(): Tests whether the parallel matching fails like the sequential one for unknown x values
         - test_visualize(): Tests whether the visualization of the results is working properly
     '''
 
@@ -478,7 +866,7 @@ class UnitTests(unittest.TestCase):
         '''
 
         print('Test Saving Data')
-        data = Data('unit_test-ideal.csv', engine, 'test_data')
+        data = Data('unit_test-ideal.csv', storage, 'test_data')
 
         self.assertEqual(data.getRows(), [[1, 1, 2, 3], [2, 4, 5, 6], [3, 7, 8, 9]], 'Rows should be [[1, 1, 2, 3], '
                                                                                      '[2, 4, 5, 6], [3, 7, 8, 9]]')
@@ -495,11 +883,34 @@ class UnitTests(unittest.TestCase):
         '''
 
         print('Test Saving Data')
-        data = Data('unit_test-ideal.csv', engine, 'test_data')
+        data = Data('unit_test-ideal.csv', storage, 'test_data')
 
         self.assertEqual(data.getColumns(), [[1, 2, 3], [1, 4, 7], [2, 5, 8], [3, 6, 9]],
                          'Columns should be [[1, 2, 3], [1, 4, 7], [2, 5, 8], [3, 6, 9]]')
 
+    def test_storage_backends(self):
+        '''
+        Unit Test
+        Tests whether every storage backend saves and returns the data in the same way
+
+        :return: None
+        '''
+
+        print('Test Storage Backends')
+        for backend in [InMemorySQLStorageBackend(), DataFrameStorageBackend()]:
+            data = Data('unit_test-ideal.csv', backend, 'test_data')
+
+            self.assertEqual(data.getRows(), [[1, 1, 2, 3], [2, 4, 5, 6], [3, 7, 8, 9]],
+                             'Rows should be [[1, 1, 2, 3], [2, 4, 5, 6], [3, 7, 8, 9]]')
+            self.assertEqual(data.getColumns(), [[1, 2, 3], [1, 4, 7], [2, 5, 8], [3, 6, 9]],
+                             'Columns should be [[1, 2, 3], [1, 4, 7], [2, 5, 8], [3, 6, 9]]')
+            self.assertEqual(data.get_dataframe()['y2'].tolist(), [2, 5, 8], 'Column y2 should be [2, 5, 8]')
+            self.assertEqual(data.get_x_row(2).y3, 6, 'The value of y3 at x=2 should be 6')
+
+        # A backend not implementing every function of the interface can not be created
+        with self.assertRaises(TypeError):
+            StorageBackend()
+
     def test_find_best_matching_function(self):
         '''
         Unit Test
@@ -510,8 +921,8 @@ class UnitTests(unittest.TestCase):
 
         print('Test find_best_matching_function')
 
-        train_data = Data('unit_test-train.csv', engine, 'test_data2')
-        ideal_data = Data('unit_test-ideal.csv', engine, 'test_data')
+        train_data = Data('unit_test-train.csv', storage, 'test_data2')
+        ideal_data = Data('unit_test-ideal.csv', storage, 'test_data')
 
         matches = find_best_matching_functions(train_data, ideal_data)
         self.assertEqual(matches, [1,3], 'Ideal Functions should be 1 and 3')
@@ -527,9 +938,9 @@ class UnitTests(unittest.TestCase):
 
         print('Test assign_test_data')
 
-        train_data = Data('unit_test-train.csv', engine, 'test_data2')
-        ideal_data = Data('unit_test-ideal.csv', engine, 'test_data')
-        test_data = Data('unit_test-test.csv', engine, 'test_data3')
+        train_data = Data('unit_test-train.csv', storage, 'test_data2')
+        ideal_data = Data('unit_test-ideal.csv', storage, 'test_data')
+        test_data = Data('unit_test-test.csv', storage, 'test_data3')
 
         matches = find_best_matching_functions(train_data, ideal_data)
 
@@ -538,6 +949,63 @@ class UnitTests(unittest.TestCase):
         self.assertEqual(assigned_tests, [{'X': 1, 'Y': 2.4, 'Delta_Y': 0.6000000000000001, 'Ideal_Function_No': 3}, {'X': 3, 'Y': 7.1, 'Delta_Y': 0.09999999999999964, 'Ideal_Function_No': 1}], 'Assignments should be: [1,2.4] -> 3; [3,7.1] -> 1')
 
 
+    def test_assign_test_data_parallel(self):
+        '''
+        Unit Test
+        Tests whether the parallel matching of data points to the best found functions and the saving of the results
+        by the writer thread is working properly
+
+        :return: None
+        '''
+
+        print('Test assign_test_data_parallel')
+
+        # Use a separate database, so the results do not interfere with test_save_assigned_data
+        backend = InMemorySQLStorageBackend()
+        Base.metadata.create_all(backend.engine)
+        session_registry = scoped_session(sessionmaker(bind=backend.engine))
+
+        train_data = Data('unit_test-train.csv', backend, 'test_data2')
+        ideal_data = Data('unit_test-ideal.csv', backend, 'test_data')
+        test_data = Data('unit_test-test.csv', backend, 'test_data3')
+
+        matches = find_best_matching_functions(train_data, ideal_data)
+
+        assigned_tests = assign_test_data_parallel(train_data, ideal_data, test_data, matches, session_registry, True,
+                                                   workers=2, batch_size=1)
+
+        self.assertEqual(assigned_tests, [{'X': 1, 'Y': 2.4, 'Delta_Y': 0.6000000000000001, 'Ideal_Function_No': 3}, {'X': 3, 'Y': 7.1, 'Delta_Y': 0.09999999999999964, 'Ideal_Function_No': 1}], 'Assignments should be: [1,2.4] -> 3; [3,7.1] -> 1')
+
+        # The writer thread may insert the batches in any order
+        saved_tests = sorted(row[1:] for row in backend.get_rows('unit_tests_test_results'))
+        self.assertEqual(saved_tests, [[1.0, 2.4, 0.6000000000000001, 3], [3.0, 7.1, 0.09999999999999964, 1]],
+                         'Test Results were not saved properly')
+
+
+    def test_assign_test_data_parallel_missing_x(self):
+        '''
+        Unit Test
+        Tests whether the parallel matching raises the same error as the sequential matching,
+        if a test data point has no row with the same x value in the ideal functions
+
+        :return: None
+        '''
+
+        print('Test assign_test_data_parallel with a missing x value')
+
+        backend = DataFrameStorageBackend()
+        train_data = Data('unit_test-train.csv', backend, 'test_data2')
+        ideal_data = Data('unit_test-ideal.csv', backend, 'test_data')
+        test_data = Data(io.StringIO('x,y\n4,1.0\n'), backend, 'test_data3')
+
+        matches = find_best_matching_functions(train_data, ideal_data)
+
+        with self.assertRaises(IndexError):
+            assign_test_data(train_data, ideal_data, test_data, matches, None, True, False)
+        with self.assertRaises(IndexError):
+            assign_test_data_parallel(train_data, ideal_data, test_data, matches, None, True, False, workers=2)
+
+
     def test_save_assigned_data(self):
         '''
         Unit Test
@@ -548,9 +1016,9 @@ class UnitTests(unittest.TestCase):
 
         print('Test assign_test_data')
 
-        train_data = Data('unit_test-train.csv', engine, 'test_data2')
-        ideal_data = Data('unit_test-ideal.csv', engine, 'test_data')
-        test_data = Data('unit_test-test.csv', engine, 'test_data3')
+        train_data = Data('unit_test-train.csv', storage, 'test_data2')
+        ideal_data = Data('unit_test-ideal.csv', storage, 'test_data')
+        test_data = Data('unit_test-test.csv', storage, 'test_data3')
 
         matches = find_best_matching_functions(train_data, ideal_data)
 